@@ -13,6 +13,9 @@
 #   BACKTEST_START=YYYY-MM-DD    # inclusive (IST)
 #   BACKTEST_END=YYYY-MM-DD      # inclusive (IST)
 #   OC_SYMBOL=NIFTY|BANKNIFTY|FINNIFTY  (default NIFTY)
+#   BACKTEST_SYMBOLS=NIFTY,BANKNIFTY  # optional; overrides OC_SYMBOL, one Snapshots read
+#   BACKTEST_WORKERS=N           # optional; default 1 (serial), N>1 → process pool
+#   BACKTEST_PERF_BUFFER=path    # optional; checkpoint base, .<start>_<end>_<syms> inserted (default /tmp/ktw_perf_buffer.jsonl)
 #
 # Tunables (symbol-wise fallbacks defined):
 #   LEVEL_BUFFER_*, ENTRY_BAND_*, TARGET_MIN_POINTS_*, OI_FLAT_EPS
@@ -21,13 +24,20 @@
 
 from __future__ import annotations
 
-import os, json, time, logging
-from typing import Any, Dict, List, Tuple, Optional
+import os, re, sys, json, time, pickle, logging
+from bisect import bisect_left, bisect_right
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from functools import lru_cache
+from operator import gt, itemgetter
+from typing import Any, Dict, Iterable, Iterator, List, Tuple, Optional
 
 try:
     import gspread  # type: ignore
+    from gspread.exceptions import APIError  # type: ignore
 except Exception:
     gspread = None  # type: ignore
+    APIError = None  # type: ignore
 
 log = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
@@ -70,14 +80,40 @@ def _parse_ts_ist(s: str) -> Tuple[int,int,int,int,int,int]:
                 int(time.strftime("%m", time.gmtime(t))),
                 int(time.strftime("%d", time.gmtime(t))), 12,0,0)
 
+_TS_DIGITS = b"0123456789"
+
+def _parse_ts_fast(s: str) -> Optional[Tuple[int,int,int,int,int,int]]:
+    """Fixed-layout 'YYYY-MM-DD HH:MM:SS[ IST]' parse via byte arithmetic.
+
+    None for anything else (caller falls back to _parse_ts_ist).
+    """
+    if not s.isascii():
+        return None
+    b = s.encode()
+    n = len(b)
+    if n == 19:
+        if b.translate(None, _TS_DIGITS) != b"-- ::":
+            return None
+    elif n == 23:
+        if b[19] != 32 or b.translate(None, _TS_DIGITS) != b"-- :: IST":
+            return None
+    else:
+        return None
+    # separators pinned in place ⇒ every other position is a digit
+    if b[4] != 45 or b[7] != 45 or b[10] != 32 or b[13] != 58 or b[16] != 58:
+        return None
+    # ord('0') folded into the constants: 48*1111 = 53328, 48*11 = 528
+    return (b[0]*1000 + b[1]*100 + b[2]*10 + b[3] - 53328,
+            b[5]*10 + b[6] - 528, b[8]*10 + b[9] - 528,
+            b[11]*10 + b[12] - 528, b[14]*10 + b[15] - 528, b[17]*10 + b[18] - 528)
+
 def _date_key(y,m,d) -> str: return f"{y:04d}-{m:02d}-{d:02d}"
-def _ist_minutes(hh,mm) -> int: return hh*60 + mm
-def _in_no_trade_window_ist(hh:int, mm:int) -> bool:
-    mins = _ist_minutes(hh,mm)
-    if 9*60+15 <= mins < 9*60+30: return True
-    if 14*60+45 <= mins < 15*60+15: return True
-    return False
-def _after_1515(hh:int, mm:int) -> bool: return (hh,mm) >= (15,15)
+
+# IST minute-of-day bounds, compared inline in the tick loop:
+# no-trade windows 09:15–09:30 and 14:45–15:15, forced exit from 15:15
+NO_TRADE_START1, NO_TRADE_END1 = 9*60+15, 9*60+30
+NO_TRADE_START2, NO_TRADE_END2 = 14*60+45, 15*60+15
+EXIT_MINS = 15*60+15
 
 # ---------------- Sheets IO ----------------
 REQ_HEADERS_PERF = [
@@ -86,7 +122,8 @@ REQ_HEADERS_PERF = [
     "pnl_points","exit_reason","mv_at_entry","notes"
 ]
 
-def _open_ws(name: str):
+@lru_cache(maxsize=1)
+def _open_spreadsheet():
     if gspread is None:
         raise RuntimeError("gspread not installed")
     raw = _env("GOOGLE_SA_JSON"); sid = _env("GSHEET_TRADES_SPREADSHEET_ID")
@@ -94,7 +131,12 @@ def _open_ws(name: str):
         raise RuntimeError("Sheets env missing")
     sa = json.loads(raw)
     gc = gspread.service_account_from_dict(sa)
-    sh = gc.open_by_key(sid)
+    return gc.open_by_key(sid)
+
+# worksheet handles are reused for the whole run (one auth + open per sheet name)
+@lru_cache(maxsize=None)
+def _open_ws(name: str):
+    sh = _open_spreadsheet()
     try:
         return sh.worksheet(name)
     except Exception:
@@ -114,16 +156,123 @@ def _ensure_perf_headers(ws) -> List[str]:
         return hdr + need
     return hdr
 
-def _append_perf_row(row: Dict[str, Any]) -> None:
-    ws = _open_ws("Performance")
-    hdr = _ensure_perf_headers(ws)
-    vals = [row.get(h,"") for h in hdr]
-    ws.append_row(vals, value_input_option="RAW")
+def _perf_col_order(hdr: List[str]) -> List[Optional[int]]:
+    """For each sheet column, its index in REQ_HEADERS_PERF (None if foreign)."""
+    pos = {h: i for i, h in enumerate(REQ_HEADERS_PERF)}
+    return [pos.get(_str(h).strip()) for h in hdr]
+
+_RETRY_STATUS = (429, 500, 503)
+# identity of a trade row, used only to resume a checkpoint without re-adding
+# rows that already reached the sheet
+_PERF_KEY_COLS = ("date","symbol","side","trigger","entry_time")
+_PERF_KEY_IDX = tuple(REQ_HEADERS_PERF.index(k) for k in _PERF_KEY_COLS)
+# alongside the other /tmp state files, not wherever cron's cwd happens to be
+_PERF_BUFFER_DEFAULT = "/tmp/ktw_perf_buffer.jsonl"
+
+def _perf_buffer_path(tag: str) -> str:
+    """BACKTEST_PERF_BUFFER with the run's range/symbols tag before the extension."""
+    base = _env("BACKTEST_PERF_BUFFER", _PERF_BUFFER_DEFAULT) or _PERF_BUFFER_DEFAULT
+    if not tag:
+        return base
+    root, ext = os.path.splitext(base)
+    return f"{root}.{re.sub(r'[^A-Za-z0-9_-]+', '_', tag)}{ext}"
+
+def _perf_key(row, idx: Tuple[int, ...] = _PERF_KEY_IDX) -> Tuple[str, ...]:
+    n = len(row)
+    return tuple((_str(row[i]).strip() if i < n else "") for i in idx)
+
+def _existing_perf_keys(ws, hdr: List[str]) -> set:
+    names = [_str(h).strip() for h in hdr]
+    idx = tuple(names.index(k) for k in _PERF_KEY_COLS)
+    return {_perf_key(r, idx) for r in ws.get_values()[1:]}
+
+def _load_perf_buffer(path: str) -> List[Tuple[Any, ...]]:
+    out: List[Tuple[Any, ...]] = []
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    r = json.loads(line)
+                except ValueError:  # torn write; the rest of the file is still usable
+                    log.warning("Performance checkpoint %s: skipping unreadable line", path)
+                    continue
+                if isinstance(r, dict):  # checkpoint from an older run
+                    r = [r.get(h, "") for h in REQ_HEADERS_PERF]
+                if isinstance(r, list):
+                    out.append(tuple(r))
+    except FileNotFoundError:
+        pass
+    return out
+
+def _append_perf_rows(rows: List[Tuple[Any, ...]], ws=None, hdr: Optional[List[str]] = None,
+                      tag: str = "") -> int:
+    """Checkpointed, retried Performance append; resumes a leftover checkpoint for the same tag."""
+    path = _perf_buffer_path(tag)
+    resumed = _load_perf_buffer(path)
+
+    if ws is None:
+        ws = _open_ws("Performance")
+    if hdr is None:
+        hdr = _ensure_perf_headers(ws)
+    rows = list(rows)
+    if resumed:
+        # a rerun recomputes the same trades, and part of the checkpoint may have landed
+        own = {_perf_key(r) for r in rows}
+        kept = [r for r in resumed if _perf_key(r) not in own]
+        if kept:
+            seen = _existing_perf_keys(ws, hdr)
+            kept = [r for r in kept if _perf_key(r) not in seen]
+        log.info("Resuming Performance checkpoint %s: %d rows, %d new",
+                 path, len(resumed), len(kept))
+        resumed = kept
+    todo: List[Tuple[Any, ...]] = resumed + rows
+
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        for r in todo:
+            f.write(json.dumps(list(r), ensure_ascii=False) + "\n")
+    os.replace(tmp, path)
+
+    if todo:
+        order = _perf_col_order(hdr)
+        if order == list(range(len(REQ_HEADERS_PERF))):
+            values = [list(r) for r in todo]
+        else:
+            values = [[r[i] if i is not None else "" for i in order] for r in todo]
+        # Sheets v4 values:append directly → one POST, no client-side range lookup
+        title = ws.title.replace("'", "''")
+        for attempt in range(6):
+            try:
+                ws.spreadsheet.values_append(
+                    f"'{title}'!A1",
+                    params={"valueInputOption": "RAW", "insertDataOption": "INSERT_ROWS"},
+                    body={"values": values},
+                )
+                break
+            except Exception as e:
+                code = getattr(getattr(e, "response", None), "status_code", None)
+                if APIError is None or not isinstance(e, APIError) or code not in _RETRY_STATUS or attempt == 5:
+                    raise
+                log.warning("Performance append HTTP %s; retry in %ds", code, 2**attempt)
+                time.sleep(2**attempt)
+
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+    return len(todo)
 
 # -------- tolerant numeric/string helpers --------
 def _num(x) -> Optional[float]:
+    if x is None or x == "" or x == "—": return None
+    if isinstance(x, (int, float)) and not isinstance(x, bool):
+        return float(x)  # UNFORMATTED_VALUE cells skip the str() round-trip
     try:
-        if x in (None,"","—"): return None
+        if isinstance(x, str) and "," not in x:
+            return float(x)
         return float(str(x).replace(",","").strip())
     except Exception:
         return None
@@ -132,50 +281,39 @@ def _str(x) -> str:
     return "" if x is None else str(x)
 
 # ---------------- Strategy helpers ----------------
-_ALLOWED_CE_MV = {"bullish","big_move"}
-_ALLOWED_PE_MV = {"bearish","strong_bearish"}
-
-def _shift_levels(s1,s2,r1,r2, buf) -> Dict[str, Optional[float]]:
+# mv → small int code at load time (0=unknown); CE side = 1..2, PE side = 3..4
+MV_CODE = {"bullish": 1, "big_move": 2, "bearish": 3, "strong_bearish": 4}
+# mv code → side it supports (module constant, indexed per tick)
+_MV_SIDE: Tuple[Optional[str], ...] = (None, "CE", "CE", "PE", "PE")
+# trigger code → name (0,1 = CE supports; 2,3 = PE resistances); the hot loop
+# carries the int code, the name is only looked up when a row is written.
+# Per-day dedupe uses bit (1 << code).
+_TRIG_NAMES = (sys.intern("S1*"), sys.intern("S2*"), sys.intern("R1*"), sys.intern("R2*"))
+
+def _shift_levels(s1,s2,r1,r2, buf) -> Tuple[Optional[float], ...]:
+    """Shifted trigger levels indexed by trigger code."""
     def sh(v, up: bool):
         if v is None or buf is None: return None
         return float(v) + float(buf) if up else float(v) - float(buf)
-    return {"S1*": sh(s1,False), "S2*": sh(s2,False), "R1*": sh(r1,True), "R2*": sh(r2,True)}
-
-def _pick_side(mv: str) -> Optional[str]:
-    m = (mv or "").strip().lower()
-    if m in _ALLOWED_CE_MV: return "CE"
-    if m in _ALLOWED_PE_MV: return "PE"
-    return None
+    return (sh(s1,False), sh(s2,False), sh(r1,True), sh(r2,True))
 
-def _nearest_trigger(spot: Optional[float], side: Optional[str], shifted: Dict[str, Optional[float]]) -> Tuple[Optional[str], Optional[float]]:
-    if spot is None or side is None: return None, None
-    pool = ["S1*","S2*"] if side=="CE" else ["R1*","R2*"]
-    best = None; bestp=None; bestd=None
-    for name in pool:
-        tp = shifted.get(name)
-        if tp is None: continue
-        d = abs(float(spot) - float(tp))
-        if bestd is None or d<bestd:
-            best, bestp, bestd = name, tp, d
-    return best, bestp
-
-def _space_points(side: str, trig_name: str, trig_price: float, s1,s2,r1,r2) -> Optional[float]:
+def _space_points(code: int, trig_price: float, s1,s2,r1,r2) -> Optional[float]:
     try:
-        if side=="CE":
-            if trig_name=="S1*": return (r1 - trig_price) if (r1 is not None) else None
-            if trig_name=="S2*": return (s1 - trig_price) if (s1 is not None) else None
-        else:
-            if trig_name=="R1*": return (trig_price - s1) if (s1 is not None) else None
-            if trig_name=="R2*": return (trig_price - r1) if (r1 is not None) else None
+        if code == 0: return (r1 - trig_price) if (r1 is not None) else None
+        if code == 1: return (s1 - trig_price) if (s1 is not None) else None
+        if code == 2: return (trig_price - s1) if (s1 is not None) else None
+        if code == 3: return (trig_price - r1) if (r1 is not None) else None
     except Exception:
         return None
     return None
 
-def _oi_class(x: Optional[float], eps: float) -> str:
-    if x is None: return "na"
-    if x > eps: return "up"
-    if x < -eps: return "down"
-    return "flat"
+OI_UP, OI_DOWN, OI_FLAT, OI_NA = 1, -1, 0, 2
+
+def _oi_class(x: Optional[float], eps: float) -> int:
+    if x is None: return OI_NA
+    if x > eps: return OI_UP
+    if x < -eps: return OI_DOWN
+    return OI_FLAT
 
 # ---------------- Exits config ----------------
 def _cfg_exits(sym: str) -> Dict[str,float]:
@@ -206,130 +344,276 @@ COLCAND = {
     "mv": ["mv","MV","view","View"],
 }
 
-def _row_pick(d: Dict[str,Any], names: List[str], default=None):
-    for n in names:
-        if n in d and d[n] not in (None, ""):
-            return d[n]
-    return default
-
-def _normalize_rows(recs: List[Dict[str,Any]]) -> List[Dict[str,Any]]:
-    out: List[Dict[str,Any]] = []
-    for r in recs:
-        row = {
-            "ts": _row_pick(r, COLCAND["ts"], ""),
-            "symbol": _str(_row_pick(r, COLCAND["symbol"], "")),
-            "expiry": _str(_row_pick(r, COLCAND["expiry"], "")),
-            "spot": _num(_row_pick(r, COLCAND["spot"], None)),
-            "s1": _num(_row_pick(r, COLCAND["s1"], None)),
-            "s2": _num(_row_pick(r, COLCAND["s2"], None)),
-            "r1": _num(_row_pick(r, COLCAND["r1"], None)),
-            "r2": _num(_row_pick(r, COLCAND["r2"], None)),
-            "pcr": _num(_row_pick(r, COLCAND["pcr"], None)),
-            "mp": _num(_row_pick(r, COLCAND["mp"], None)),
-            "ce": _num(_row_pick(r, COLCAND["ce"], None)),
-            "pe": _num(_row_pick(r, COLCAND["pe"], None)),
-            "mv": (_row_pick(r, COLCAND["mv"], "") or "").strip().lower(),
-        }
-        out.append(row)
-    return out
+_NUM_FIELDS = ("spot","s1","s2","r1","r2","pcr","mp","ce","pe")
 
-def _load_sheet_rows(name: str) -> List[Dict[str,Any]]:
-    ws = _open_ws(name)
-    recs = ws.get_all_records() or []
-    return _normalize_rows(recs)
+_DATE_KEY_RE = re.compile(r"\d{4}-\d{2}-\d{2}$")
+
+def _col_letter(n: int) -> str:
+    s = ""
+    while n > 0:
+        n, rem = divmod(n - 1, 26)
+        s = chr(65 + rem) + s
+    return s or "A"
+
+def _ts_keys(ws) -> Optional[Tuple[List[Any], int, List[str]]]:
+    """(header, ts column index, per-row YYYY-MM-DD keys) from row 1 + the ts column.
+
+    None when the ts column is missing or any cell does not start with an ISO date.
+    """
+    hdr = ws.row_values(1)
+    ts_idx = next((hdr.index(n) for n in COLCAND["ts"] if n in hdr), None)
+    if ts_idx is None:
+        return None
+    keys = [str(v).strip()[:10] for v in ws.col_values(ts_idx + 1)[1:]]
+    if not keys or not all(_DATE_KEY_RE.match(k) for k in keys):
+        return None
+    return hdr, ts_idx, keys
 
-def _get_snapshots_any() -> Tuple[str, List[Dict[str,Any]]]:
-    """Returns (source_name, rows). Tries Snapshots, else OC_Live."""
+def _date_row_span(keys: List[str], start_key: str, end_key: str) -> Optional[Tuple[int, int]]:
+    """(first_row, last_row) of the sheet rows inside [start_key, end_key], None if unsorted."""
+    if any(a > b for a, b in zip(keys, keys[1:])):
+        return None
+    # data row i lives on sheet row i+2 (row 1 is the header)
+    return bisect_left(keys, start_key) + 2, bisect_right(keys, end_key) + 1
+
+# more runs than this and one full read is cheaper than a long ranges list
+_MAX_ROW_RUNS = 100
+
+def _date_row_runs(keys: List[str], start_key: str, end_key: str) -> List[Tuple[int, int]]:
+    """Contiguous (first_row, last_row) sheet-row runs whose date key is in range.
+
+    For ISO-dated sheets that are not date-sorted, where one span cannot be used.
+    """
+    runs: List[Tuple[int, int]] = []
+    for i, k in enumerate(keys):
+        if start_key <= k <= end_key:
+            r = i + 2
+            if runs and runs[-1][1] == r - 1:
+                runs[-1] = (runs[-1][0], r)
+            else:
+                runs.append((r, r))
+    return runs
+
+def _load_sheet_rows(name: str, start_key: Optional[str] = None,
+                     end_key: Optional[str] = None) -> Tuple[List[Any], List[List[Any]], bool]:
+    """(header, raw data rows, sheet has any data rows); normalisation happens in _load_and_filter."""
+    ws = _open_ws(name)
+    # numbers come back native, date/time cells stay formatted text so ts
+    # parsing is unchanged
+    opts = dict(value_render_option="UNFORMATTED_VALUE",
+                date_time_render_option="FORMATTED_STRING")
+
+    meta = None
+    if start_key and end_key:
+        try:
+            meta = _ts_keys(ws)
+        except Exception as e:
+            log.info("%s: date span lookup failed (%s) → full read", name, e)
+    if meta is not None:
+        hdr, ts_idx, keys = meta
+        span = _date_row_span(keys, start_key, end_key)
+        if span is not None:
+            r0, r1 = span
+            log.info("%s: reading rows %d..%d for %s..%s", name, r0, r1, start_key, end_key)
+            if r0 > r1:
+                return hdr, [], True
+            rows = ws.get_values(f"A{r0}:{_col_letter(len(hdr))}{r1}", **opts) or []
+            return hdr, rows, True
+        # unsorted: fetch just the in-range runs, same render options as the full read
+        runs = _date_row_runs(keys, start_key, end_key)
+        if len(runs) <= _MAX_ROW_RUNS:
+            log.info("%s: reading %d row runs for %s..%s", name, len(runs), start_key, end_key)
+            if not runs:
+                return hdr, [], True
+            last = _col_letter(len(hdr))
+            got = ws.batch_get([f"A{a}:{last}{b}" for a, b in runs], **opts)
+            return hdr, [r for vr in got for r in vr], True
+
+    # single values fetch (no per-row dicts from get_all_records)
+    raw = ws.get_values(**opts) or []
+    if len(raw) < 2:
+        return [], [], False
+    return raw[0], raw[1:], True
+
+def _get_snapshots_any(start_key: Optional[str] = None,
+                       end_key: Optional[str] = None) -> Tuple[str, List[Any], List[List[Any]]]:
+    """Returns (source_name, header, rows). Tries Snapshots, else OC_Live.
+
+    With a date range, date-sorted sheets are read only over the matching rows;
+    unsorted ISO-dated sheets only over the in-range row runs when few enough.
+    """
     try:
-        snaps = _load_sheet_rows("Snapshots")
+        hdr, snaps, has_data = _load_sheet_rows("Snapshots", start_key, end_key)
     except Exception as e:
         log.warning("Snapshots read failed: %s", e)
-        snaps = []
-    if snaps:
-        return "Snapshots", snaps
+        hdr, snaps, has_data = [], [], False
+    if has_data:
+        # only an empty/unreadable Snapshots falls back, not an empty date range
+        if not snaps:
+            log.info("Snapshots: no rows in %s..%s", start_key, end_key)
+        return "Snapshots", hdr, snaps
 
     log.info("Snapshots empty → falling back to OC_Live")
     try:
-        live = _load_sheet_rows("OC_Live")
+        hdr, live, has_data = _load_sheet_rows("OC_Live", start_key, end_key)
     except Exception as e:
         log.warning("OC_Live read failed: %s", e)
-        live = []
-    return ("OC_Live" if live else "none"), live
-
-# ---------------- Core backtest ----------------
-def run_backtest() -> None:
-    sym = (_env("OC_SYMBOL","NIFTY") or "NIFTY").upper()
-    buf = _sym_env(sym, "LEVEL_BUFFER", 12.0)
-    band = _sym_env(sym, "ENTRY_BAND", 3.0)
-    tgt_req = _sym_env(sym, "TARGET_MIN_POINTS", 30.0)
-    oi_eps = float(_env("OI_FLAT_EPS","0"))
-
-    y0, m0, d0 = [int(x) for x in (_env("BACKTEST_START","") or _date_key(*_parse_ts_ist(""))).split("-")]
-    y1, m1, d1 = [int(x) for x in (_env("BACKTEST_END","")   or _date_key(*_parse_ts_ist(""))).split("-")]
-    start_key = _date_key(y0,m0,d0)
-    end_key   = _date_key(y1,m1,d1)
-
-    source_name, snaps = _get_snapshots_any()
-    if not snaps:
-        raise RuntimeError("Snapshots/OC_Live both empty or not accessible")
-
-    # normalize + filter
-    items: List[Tuple[str,Dict[str,Any]]] = []
-    for r in snaps:
-        ts = _str(r.get("ts") or "")
-        y,m,d,hh,mm,ss = _parse_ts_ist(ts or "")
+        hdr, live, has_data = [], [], False
+    return ("OC_Live" if has_data else "none"), hdr, live
+
+_NO_COL = 1 << 30  # index for absent fields: `i < len(r)` is always False
+
+def _iter_sheet_rows(hdr: List[Any], rows: List[List[Any]], syms: List[str],
+                     start_key: str, end_key: str) -> Iterator[Tuple[str, Tuple[int,Tuple[Any,...]]]]:
+    """Raw sheet rows → (symbol, (key, tick)) one row at a time, in sheet order.
+
+    Each field resolves to ONE column (first COLCAND header present). Date and
+    symbol filters run before any numeric coercion. Symbol is "" for rows
+    without one (they apply to every requested symbol).
+    """
+    ci: Dict[str,int] = {}
+    for i, h in enumerate(hdr):
+        ci.setdefault(_str(h), i)  # first occurrence wins on dupes
+    col_idx = {k: next((ci[n] for n in names if n in ci), _NO_COL) for k, names in COLCAND.items()}
+    i_ts, i_sym, i_mv = col_idx["ts"], col_idx["symbol"], col_idx["mv"]
+    i_num = [col_idx[k] for k in _NUM_FIELDS]  # same order as in TICK_FIELDS
+    wanted = frozenset(syms)
+
+    for r in rows:
+        n = len(r)
+        # cheapest rejections first: symbol, then date, then numeric coercion
+        rsym = _str(r[i_sym] if i_sym < n else None).upper()
+        if rsym and rsym not in wanted:
+            continue
+        ts = _str((r[i_ts] if i_ts < n else None) or "")
+        y,m,d,hh,mm,ss = _parse_ts_fast(ts) or _parse_ts_ist(ts)
         datek = _date_key(y,m,d)
         if datek < start_key or datek > end_key:
             continue
-        rsym = (r.get("symbol") or "").upper()
-        if rsym and rsym != sym:
-            continue
-        row = {
-            "date": datek, "hh": hh, "mm": mm, "ss": ss,
-            "spot": _num(r.get("spot")), "s1": _num(r.get("s1")), "s2": _num(r.get("s2")),
-            "r1": _num(r.get("r1")), "r2": _num(r.get("r2")),
-            "pcr": _num(r.get("pcr")), "mp": _num(r.get("mp")),
-            "ce": _num(r.get("ce")), "pe": _num(r.get("pe")),
-            "mv":  (r.get("mv") or "").strip().lower(),
-            "asof": ts,
-        }
-        items.append( (f"{datek} {hh:02d}:{mm:02d}:{ss:02d}", row) )
-
-    items.sort(key=lambda x: x[0])
-    if not items:
-        raise RuntimeError(f"No rows in {source_name} for given date range/symbol {sym}")
-
-    log.info("Backtest source: %s (rows=%d)", source_name, len(items))
+        mv = _str(r[i_mv] if i_mv < n else None).strip().lower()
+        # per-cell _num on surviving rows only (native floats take its fast path);
+        # replaces the old column-at-a-time _num_col, which coerced every row
+        spot, s1, s2, r1, r2, pcr, mp, ce, pe = [(_num(r[i]) if i < n else None) for i in i_num]
+        row = (datek, hh, mm, ss, spot, s1, s2, r1, r2, pcr, mp, ce, pe,
+               mv, MV_CODE.get(mv, 0), ts)  # TICK_FIELDS order
+        # packed YYYYMMDDhhmmss int → single C-level compare per sort step
+        yield rsym, (y*10**10 + m*10**8 + d*10**6 + hh*10**4 + mm*10**2 + ss, row)
+
+def _load_and_filter(hdr: List[Any], rows: List[List[Any]], syms: List[str],
+                     start_key: str, end_key: str) -> Dict[str, List[Tuple[int,Tuple[Any,...]]]]:
+    """Per-symbol time-sorted (key, tick) lists; symbol-less rows go to every bucket."""
+    buckets: Dict[str, List[Tuple[int,Tuple[Any,...]]]] = {s: [] for s in syms}
+    all_lists = list(buckets.values())
+    for rsym, item in _iter_sheet_rows(hdr, rows, syms, start_key, end_key):
+        if rsym:
+            buckets[rsym].append(item)
+        else:
+            for dest in all_lists:
+                dest.append(item)
+
+    # Snapshots is append-ordered, so usually already sorted: one linear
+    # monotonic check, and only sort when some key goes backwards
+    for items in all_lists:
+        keys = list(map(itemgetter(0), items))
+        if any(map(gt, keys, keys[1:])):
+            items.sort(key=itemgetter(0))
+    return buckets
+
+class _NotSorted(Exception):
+    pass
+
+def _monotone(pairs: Iterator[Tuple[str, Tuple[int,Tuple[Any,...]]]],
+              count: List[int]) -> Iterator[Tuple[int,Tuple[Any,...]]]:
+    """Pass ticks through while keys are non-decreasing; raise _NotSorted otherwise."""
+    last = -1
+    for _, item in pairs:
+        if item[0] < last:
+            raise _NotSorted()
+        last = item[0]
+        count[0] += 1
+        yield item
+
+def _stream_single(sym: str, hdr: List[Any], rows: List[List[Any]],
+                   start_key: str, end_key: str) -> Optional[Tuple[int, List[Tuple[Any,...]]]]:
+    """Feed sheet rows straight into _simulate without materialising a tick list.
+
+    Returns (n_ticks, trades), or None when the rows turn out not to be
+    time-sorted; _simulate is pure, so the caller just reruns via the sort path.
+    """
+    count = [0]
+    try:
+        trades = _simulate(sym, _monotone(_iter_sheet_rows(hdr, rows, [sym], start_key, end_key), count))
+    except _NotSorted:
+        log.info("%s: ticks not time-sorted → buffered sort path", sym)
+        return None
+    return count[0], trades
+
+# ---------------- Core backtest ----------------
+@dataclass(slots=True)
+class OpenTrade:
+    date: str
+    side: str            # "CE" | "PE"
+    trigger: int         # index into _TRIG_NAMES
+    trigger_price: float
+    entry_ts: str
+    entry_spot: float
+    last_spot: float
+    trail: float         # -inf (CE) / +inf (PE) until the trail arms
+    mv: str
+    mv_bad_streak: int = 0
+
+# tick row layout (one flat tuple per tick, unpacked once in the loop)
+TICK_FIELDS = ("date","hh","mm","ss","spot","s1","s2","r1","r2",
+               "pcr","mp","ce","pe","mv","mv_code","asof")
+
+def _simulate(sym: str, items: Iterable[Tuple[int,Tuple[Any,...]]]) -> List[Tuple[Any,...]]:
+    """Run the entry/exit state machine over time-sorted (key, tick) pairs.
+
+    Each tick is a TICK_FIELDS-ordered tuple.
+
+    Pure compute (no Sheets I/O): returns closed-trade rows as tuples in
+    REQ_HEADERS_PERF, in exit order, for the caller to write out.
+    """
+    # loop invariants: every ENV/config value resolved to a plain local once
+    buf = float(_sym_env(sym, "LEVEL_BUFFER", 12.0))
+    band = float(_sym_env(sym, "ENTRY_BAND", 3.0))
+    tgt_req = float(_sym_env(sym, "TARGET_MIN_POINTS", 30.0))
+    oi_eps = float(_env("OI_FLAT_EPS","0"))
+    cfg_exit = _cfg_exits(sym)
+    TP = float(cfg_exit["TP"]); SL = float(cfg_exit["SL"])
+    TRL_TRIG = float(cfg_exit["TRL_TRIG"]); TRL_OFF = float(cfg_exit["TRL_OFF"])
+    MV_REV_N = int(cfg_exit["MV_REV_N"])
 
     # state per day
-    open_trade: Optional[Dict[str,Any]] = None
+    open_trade: Optional[OpenTrade] = None
     last_date = None
-    dedupe_today: set = set()
-    closed_count = 0
-
-    cfg_exit = _cfg_exits(sym)
+    dedupe_mask = 0
+    prev_levels: Optional[Tuple[Any, ...]] = None
+    shifted: Tuple[Optional[float], ...] = (None, None, None, None)
+    closed: List[Tuple[Any,...]] = []
+
+    pnl_str_fmt = "{:.2f}".format
+    # bound format method; only called on the ticks that enter or exit
+    tick_ts = "{} {:02d}:{:02d}:{:02d} IST".format
+
+    def _emit_exit(ot: OpenTrade, reason: str, exit_time: str,
+                   spot: Optional[float], notes: str = "") -> None:
+        pnl = _pnl_points(ot.side, ot.entry_spot, spot)
+        # REQ_HEADERS_PERF order
+        closed.append((ot.date, sym, ot.side, _TRIG_NAMES[ot.trigger], ot.trigger_price,
+                       ot.entry_ts, ot.entry_spot, exit_time, spot,
+                       pnl_str_fmt(pnl), reason, ot.mv, notes))
 
     def flush_day(datek: str):
-        nonlocal open_trade, dedupe_today
-        if open_trade:
+        nonlocal open_trade, dedupe_mask
+        if open_trade is not None:
             ot = open_trade
-            pnl = _pnl_points(ot["side"], ot["entry_spot"], ot["last_spot"])
-            _append_perf_row({
-                "date": ot["date"], "symbol": sym, "side": ot["side"],
-                "trigger": ot["trigger"], "trigger_price": ot["trigger_price"],
-                "entry_time": ot["entry_ts"], "entry_spot": ot["entry_spot"],
-                "exit_time": f"{ot['date']} 15:15:00 IST",
-                "exit_spot": ot["last_spot"], "pnl_points": f"{pnl:.2f}",
-                "exit_reason": "TIME", "mv_at_entry": ot["mv"], "notes": "day-end"
-            })
+            _emit_exit(ot, "TIME", f"{ot.date} 15:15:00 IST", ot.last_spot, notes="day-end")
         open_trade = None
-        dedupe_today = set()
+        dedupe_mask = 0
 
-    for key, row in items:
-        datek = row["date"]; hh,mm,ss = row["hh"], row["mm"], row["ss"]
-        spot = row["spot"]; s1=row["s1"]; s2=row["s2"]; r1=row["r1"]; r2=row["r2"]
-        ce=row["ce"]; pe=row["pe"]; mv=row["mv"]; mp=row["mp"]; pcr=row["pcr"]
-        shifted = _shift_levels(s1,s2,r1,r2, buf)
+    for key, (datek, hh, mm, ss, spot, s1, s2, r1, r2,
+              pcr, mp, ce, pe, mv, mv_code, asof) in items:
 
         if last_date is None:
             last_date = datek
@@ -338,166 +622,242 @@ def run_backtest() -> None:
             last_date = datek
 
         # update open trade & evaluate exits first
-        if open_trade:
+        if open_trade is not None:
             ot = open_trade
             if spot is not None:
-                ot["last_spot"] = spot
-
-            if _after_1515(hh,mm):
-                pnl = _pnl_points(ot["side"], ot["entry_spot"], spot)
-                _append_perf_row({
-                    "date": ot["date"], "symbol": sym, "side": ot["side"],
-                    "trigger": ot["trigger"], "trigger_price": ot["trigger_price"],
-                    "entry_time": ot["entry_ts"], "entry_spot": ot["entry_spot"],
-                    "exit_time": f"{datek} {hh:02d}:{mm:02d}:{ss:02d} IST",
-                    "exit_spot": spot, "pnl_points": f"{pnl:.2f}",
-                    "exit_reason": "TIME", "mv_at_entry": ot["mv"], "notes": ""
-                })
-                open_trade = None; closed_count += 1
+                ot.last_spot = spot
+
+            if hh*60 + mm >= EXIT_MINS:
+                _emit_exit(ot, "TIME", tick_ts(datek, hh, mm, ss), spot)
+                open_trade = None
                 continue
 
-            TP = float(cfg_exit["TP"]); SL = float(cfg_exit["SL"])
             if spot is not None:
-                fav = (spot - ot["entry_spot"]) if ot["side"]=="CE" else (ot["entry_spot"] - spot)
+                fav = (spot - ot.entry_spot) if ot.side=="CE" else (ot.entry_spot - spot)
                 adv = -fav
                 if adv >= SL:
-                    pnl = _pnl_points(ot["side"], ot["entry_spot"], spot)
-                    _append_perf_row({
-                        "date": ot["date"], "symbol": sym, "side": ot["side"],
-                        "trigger": ot["trigger"], "trigger_price": ot["trigger_price"],
-                        "entry_time": ot["entry_ts"], "entry_spot": ot["entry_spot"],
-                        "exit_time": f"{datek} {hh:02d}:{mm:02d}:{ss:02d} IST",
-                        "exit_spot": spot, "pnl_points": f"{pnl:.2f}",
-                        "exit_reason": "SL", "mv_at_entry": ot["mv"], "notes": ""
-                    })
-                    open_trade = None; closed_count += 1
+                    _emit_exit(ot, "SL", tick_ts(datek, hh, mm, ss), spot)
+                    open_trade = None
                     continue
                 if fav >= TP:
-                    pnl = _pnl_points(ot["side"], ot["entry_spot"], spot)
-                    _append_perf_row({
-                        "date": ot["date"], "symbol": sym, "side": ot["side"],
-                        "trigger": ot["trigger"], "trigger_price": ot["trigger_price"],
-                        "entry_time": ot["entry_ts"], "entry_spot": ot["entry_spot"],
-                        "exit_time": f"{datek} {hh:02d}:{mm:02d}:{ss:02d} IST",
-                        "exit_spot": spot, "pnl_points": f"{pnl:.2f}",
-                        "exit_reason": "TP", "mv_at_entry": ot["mv"], "notes": ""
-                    })
-                    open_trade = None; closed_count += 1
+                    _emit_exit(ot, "TP", tick_ts(datek, hh, mm, ss), spot)
+                    open_trade = None
                     continue
 
                 # trailing
-                tr_trig = float(cfg_exit["TRL_TRIG"]); tr_off = float(cfg_exit["TRL_OFF"])
-                trail = ot.get("trail")
-                if ot["side"]=="CE":
-                    if fav >= tr_trig:
-                        new_tr = spot - tr_off
-                        trail = max(trail, new_tr) if trail is not None else new_tr
-                        ot["trail"] = trail
-                    if trail is not None and spot <= trail:
-                        pnl = _pnl_points(ot["side"], ot["entry_spot"], spot)
-                        _append_perf_row({
-                            "date": ot["date"], "symbol": sym, "side": ot["side"],
-                            "trigger": ot["trigger"], "trigger_price": ot["trigger_price"],
-                            "entry_time": ot["entry_ts"], "entry_spot": ot["entry_spot"],
-                            "exit_time": f"{datek} {hh:02d}:{mm:02d}:{ss:02d} IST",
-                            "exit_spot": spot, "pnl_points": f"{pnl:.2f}",
-                            "exit_reason": "TRAIL", "mv_at_entry": ot["mv"], "notes": ""
-                        })
-                        open_trade = None; closed_count += 1
+                # trail starts at -inf (CE) / +inf (PE), so no None checks per tick
+                if ot.side=="CE":
+                    if fav >= TRL_TRIG:
+                        ot.trail = max(ot.trail, spot - TRL_OFF)
+                    if spot <= ot.trail:
+                        _emit_exit(ot, "TRAIL", tick_ts(datek, hh, mm, ss), spot)
+                        open_trade = None
                         continue
                 else:
-                    if fav >= tr_trig:
-                        new_tr = spot + tr_off
-                        trail = min(trail, new_tr) if trail is not None else new_tr
-                        ot["trail"] = trail
-                    if trail is not None and spot >= trail:
-                        pnl = _pnl_points(ot["side"], ot["entry_spot"], spot)
-                        _append_perf_row({
-                            "date": ot["date"], "symbol": sym, "side": ot["side"],
-                            "trigger": ot["trigger"], "trigger_price": ot["trigger_price"],
-                            "entry_time": ot["entry_ts"], "entry_spot": ot["entry_spot"],
-                            "exit_time": f"{datek} {hh:02d}:{mm:02d}:{ss:02d} IST",
-                            "exit_spot": spot, "pnl_points": f"{pnl:.2f}",
-                            "exit_reason": "TRAIL", "mv_at_entry": ot["mv"], "notes": ""
-                        })
-                        open_trade = None; closed_count += 1
+                    if fav >= TRL_TRIG:
+                        ot.trail = min(ot.trail, spot + TRL_OFF)
+                    if spot >= ot.trail:
+                        _emit_exit(ot, "TRAIL", tick_ts(datek, hh, mm, ss), spot)
+                        open_trade = None
                         continue
 
                 # MV reversal
-                mv_bad = ((ot["side"]=="CE" and mv in {"bearish","strong_bearish"}) or
-                          (ot["side"]=="PE" and mv in {"bullish","big_move"}))
+                mv_side = _MV_SIDE[mv_code]
+                mv_bad = mv_side is not None and mv_side != ot.side
                 if mv_bad:
-                    ot["mv_bad_streak"] = int(ot.get("mv_bad_streak",0)) + 1
-                    if ot["mv_bad_streak"] >= int(cfg_exit["MV_REV_N"]):
-                        pnl = _pnl_points(ot["side"], ot["entry_spot"], spot)
-                        _append_perf_row({
-                            "date": ot["date"], "symbol": sym, "side": ot["side"],
-                            "trigger": ot["trigger"], "trigger_price": ot["trigger_price"],
-                            "entry_time": ot["entry_ts"], "entry_spot": ot["entry_spot"],
-                            "exit_time": f"{datek} {hh:02d}:{mm:02d}:{ss:02d} IST",
-                            "exit_spot": spot, "pnl_points": f"{pnl:.2f}",
-                            "exit_reason": "MV_REVERSAL", "mv_at_entry": ot["mv"], "notes": ""
-                        })
-                        open_trade = None; closed_count += 1
+                    ot.mv_bad_streak += 1
+                    if ot.mv_bad_streak >= MV_REV_N:
+                        _emit_exit(ot, "MV_REVERSAL", tick_ts(datek, hh, mm, ss), spot)
+                        open_trade = None
                         continue
                 else:
-                    ot["mv_bad_streak"] = 0
+                    ot.mv_bad_streak = 0
 
         # search entry only if no open trade
-        if open_trade:
+        if open_trade is not None:
             continue
 
-        # ENTRY eval (C1..C6 simplified to needed checks for backtest)
-        side = _pick_side(mv)
+        # ENTRY eval (C1..C6 simplified to needed checks for backtest);
+        # every check is a pure filter, so cheapest int compares go first
+        mins = hh*60 + mm  # C4 time
+        if NO_TRADE_START1 <= mins < NO_TRADE_END1 or NO_TRADE_START2 <= mins < NO_TRADE_END2:
+            continue
+        side = _MV_SIDE[mv_code]
         if side is None:
             continue
-        trig_name, trig_price = _nearest_trigger(spot, side, shifted)
-        if not (trig_name and trig_price is not None and spot is not None):
+        if spot is None:
+            continue
+        # pivots change a few times a day: re-shift only when they do
+        levels = (s1, s2, r1, r2)
+        if levels != prev_levels:
+            shifted = _shift_levels(s1,s2,r1,r2, buf)
+            prev_levels = levels
+        # nearest trigger on the side's pool (S1*/S2* for CE, R1*/R2* for PE); ties → first
+        c0 = 0 if side == "CE" else 2
+        p0 = shifted[c0]; p1 = shifted[c0 + 1]
+        if p0 is not None and (p1 is None or not abs(spot - p1) < abs(spot - p0)):
+            trig_code, trig_price = c0, p0
+        elif p1 is not None:
+            trig_code, trig_price = c0 + 1, p1
+        else:
+            continue
+
+        # per-level-per-day dedupe (C5 subset)
+        bit = 1 << trig_code
+        if dedupe_mask & bit:
             continue
 
-        within = abs(float(spot) - float(trig_price)) <= float(band)  # C1
+        within = abs(spot - trig_price) <= band  # C1
         if not within: continue
-        if _in_no_trade_window_ist(hh,mm):  # C4 time
-            continue
 
         # C3: OI delta patterns
-        ce_sig = _oi_class(ce, float(_env("OI_FLAT_EPS","0")))
-        pe_sig = _oi_class(pe, float(_env("OI_FLAT_EPS","0")))
+        ce_sig = _oi_class(ce, oi_eps)
+        pe_sig = _oi_class(pe, oi_eps)
         if side=="CE":
-            c3_ok = ((ce_sig=="down" and pe_sig=="up") or
-                     (ce_sig=="down" and pe_sig=="down") or
-                     ((ce_sig in {"flat","down"}) and pe_sig=="up"))
+            # CE↓ & PE↑/↓, or CE flat & PE↑
+            c3_ok = ((ce_sig == OI_DOWN and (pe_sig == OI_UP or pe_sig == OI_DOWN)) or
+                     (ce_sig == OI_FLAT and pe_sig == OI_UP))
         else:
-            c3_ok = ((ce_sig=="up" and pe_sig=="down") or
-                     (ce_sig=="down" and pe_sig=="down") or
-                     (ce_sig=="up" and pe_sig in {"flat","down"}))
+            # CE↑ & PE↓/flat, or CE↓ & PE↓
+            c3_ok = ((ce_sig == OI_UP and (pe_sig == OI_DOWN or pe_sig == OI_FLAT)) or
+                     (ce_sig == OI_DOWN and pe_sig == OI_DOWN))
         if not c3_ok: continue
 
-        space = _space_points(side, trig_name, float(trig_price), s1,s2,r1,r2)  # C6
-        tgt_req = _sym_env(sym, "TARGET_MIN_POINTS", 30.0)
-        if space is None or float(space) < float(tgt_req):
-            continue
-
-        # per-level-per-day dedupe (C5 subset)
-        dkey = f"{datek}|{side}|{trig_name}"
-        if dkey in dedupe_today:
+        space = _space_points(trig_code, float(trig_price), s1,s2,r1,r2)  # C6
+        if space is None or float(space) < tgt_req:
             continue
 
         # ENTRY confirmed
-        dedupe_today.add(dkey)
-        open_trade = {
-            "date": datek, "side": side, "trigger": trig_name, "trigger_price": float(trig_price),
-            "entry_ts": f"{datek} {hh:02d}:{mm:02d}:{ss:02d} IST",
-            "entry_spot": float(spot), "last_spot": float(spot),
-            "trail": None, "mv": mv, "mv_bad_streak": 0
-        }
+        dedupe_mask |= bit
+        open_trade = OpenTrade(
+            date=datek, side=side, trigger=trig_code, trigger_price=float(trig_price),
+            entry_ts=tick_ts(datek, hh, mm, ss),
+            entry_spot=float(spot), last_spot=float(spot),
+            trail=float("-inf") if side=="CE" else float("inf"), mv=mv,
+        )
 
     if last_date is not None:
         flush_day(last_date)
 
-    log.info("Backtest finished. Closed trades appended to Performance.")
-    return
+    return closed
+
+def run_backtest_for_symbol(sym: str, items_bytes: bytes) -> List[Tuple[Any,...]]:
+    """Worker entry: pickled (key,row) list in, closed trades out (no Sheets I/O)."""
+    return _simulate(sym, pickle.loads(items_bytes))
+
+def _day_chunks(items: List[Tuple[int,Tuple[Any,...]]], n: int) -> List[List[Tuple[int,Tuple[Any,...]]]]:
+    """Split time-sorted ticks into <= n contiguous chunks of similar size,
+    cutting only at day boundaries. Days are independent (flush_day resets all
+    state), so simulating the chunks separately and concatenating the closed
+    trades in order gives the same rows as one pass."""
+    if n <= 1 or not items:
+        return [items]
+    target = len(items) / n
+    chunks: List[List[Tuple[int,Tuple[Any,...]]]] = []
+    start = 0
+    prev_day = items[0][0] // 1_000_000  # packed key → YYYYMMDD
+    for i in range(1, len(items)):
+        day = items[i][0] // 1_000_000
+        if day != prev_day:
+            if i - start >= target and len(chunks) < n - 1:
+                chunks.append(items[start:i])
+                start = i
+            prev_day = day
+    chunks.append(items[start:])
+    return chunks
+
+def _symbols_from_env() -> List[str]:
+    raw = _env("BACKTEST_SYMBOLS") or _env("OC_SYMBOL","NIFTY") or "NIFTY"
+    out: List[str] = []
+    for s in raw.split(","):
+        s = s.strip().upper()
+        if s and s not in out:
+            out.append(s)
+    return out or ["NIFTY"]
+
+def _workers_from_env() -> int:
+    """Serial unless BACKTEST_WORKERS asks for a pool."""
+    try:
+        w = int(_env("BACKTEST_WORKERS","1") or 1)
+    except Exception:
+        w = 1
+    return max(1, w)
+
+def _run_buffered(source_name: str, hdr: List[Any], snaps: List[List[Any]], syms: List[str],
+                  start_key: str, end_key: str, workers: int) -> Dict[str, List[Tuple[Any,...]]]:
+    """Bucket + sort ticks per symbol, then simulate serially or in the pool."""
+    buckets = _load_and_filter(hdr, snaps, syms, start_key, end_key)
+    jobs = [s for s in syms if buckets[s]]
+    for s in syms:
+        if not buckets[s]:
+            log.warning("No rows in %s for given date range/symbol %s", source_name, s)
+    if not jobs:
+        raise RuntimeError(f"No rows in {source_name} for given date range/symbol {','.join(syms)}")
+
+    for s in jobs:
+        log.info("Backtest source: %s (symbol=%s rows=%d)", source_name, s, len(buckets[s]))
+
+    results: Dict[str, List[Tuple[Any,...]]] = {s: [] for s in jobs}
+    if workers == 1:
+        for s in jobs:
+            results[s] = _simulate(s, buckets[s])
+    else:
+        # fan out per symbol AND per block of days, so a single-symbol run
+        # still uses every worker
+        per_sym = -(-workers // len(jobs))
+        tasks = [(s, c) for s in jobs for c in _day_chunks(buckets[s], per_sym)]
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as ex:
+            futs = [(s, ex.submit(run_backtest_for_symbol, s,
+                                  pickle.dumps(c, protocol=pickle.HIGHEST_PROTOCOL)))
+                    for s, c in tasks]
+            for s, f in futs:  # submission order == time order within a symbol
+                results[s].extend(f.result())
+    return results
+
+def main() -> None:
+    syms = _symbols_from_env()
+
+    y0, m0, d0 = [int(x) for x in (_env("BACKTEST_START","") or _date_key(*_parse_ts_ist(""))).split("-")]
+    y1, m1, d1 = [int(x) for x in (_env("BACKTEST_END","")   or _date_key(*_parse_ts_ist(""))).split("-")]
+    start_key = _date_key(y0,m0,d0)
+    end_key   = _date_key(y1,m1,d1)
+
+    # Performance sheet + headers resolved once, up front (fail fast on auth)
+    perf_ws = _open_ws("Performance")
+    perf_hdr = _ensure_perf_headers(perf_ws)
+
+    # one Snapshots read shared by every symbol
+    source_name, hdr, snaps = _get_snapshots_any(start_key, end_key)
+    if source_name == "none":
+        raise RuntimeError("Snapshots/OC_Live both empty or not accessible")
+
+    workers = _workers_from_env()
+    results: Dict[str, List[Tuple[Any,...]]] = {}
+
+    # serial single-symbol run: stream rows into the state machine, no tick list
+    if workers == 1 and len(syms) == 1:
+        got = _stream_single(syms[0], hdr, snaps, start_key, end_key)
+        if got is not None and got[0]:
+            log.info("Backtest source: %s (symbol=%s rows=%d)", source_name, syms[0], got[0])
+            results[syms[0]] = got[1]
+    if not results:
+        results = _run_buffered(source_name, hdr, snaps, syms, start_key, end_key, workers)
+    del snaps
+    jobs = list(results)
+
+    # Sheets writes stay in the parent: one authorised client, no interleaved appends
+    trades: List[Tuple[Any,...]] = []
+    for s in jobs:
+        trades.extend(results[s])
+        log.info("Backtest %s: %d closed trades", s, len(results[s]))
+    n = _append_perf_rows(trades, perf_ws, perf_hdr, f"{start_key}_{end_key}_{'-'.join(syms)}")
+
+    log.info("Backtest finished. Closed trades appended to Performance (n=%d).", n)
+
+def run_backtest() -> None:
+    """Backward-compatible entry point (BACKTEST_SYMBOLS or OC_SYMBOL)."""
+    main()
 
 # ---------------- CLI ----------------
 if __name__ == "__main__":
-    run_backtest()
+    main()
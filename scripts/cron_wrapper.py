@@ -1,6 +1,9 @@
 #!/usr/bin/env python
 import os
 import sys
+import fcntl
+import signal
+from contextlib import contextmanager
 from datetime import datetime, timezone
 
 # Ensure src on path when Render cron runs from repo root
@@ -9,10 +12,51 @@ if SRC not in sys.path:
     sys.path.insert(0, SRC)
 
 from utils.logger import log
-from integrations import sheets as sh
+
+LOCKFILE = os.getenv("CRON_LOCKFILE", "/tmp/ktw_cron.lock")
+
+def _lock_path(job: str) -> str:
+    """Per-job lock path: /tmp/ktw_cron.lock -> /tmp/ktw_cron.backup.lock."""
+    root, ext = os.path.splitext(LOCKFILE)
+    safe = "".join(c if c.isalnum() or c in "-_" else "_" for c in job)
+    return f"{root}.{safe}{ext}"
+
+@contextmanager
+def _lockfile(path: str):
+    """flock-held job lock (released by the kernel on any exit); yields False if already held."""
+    fd = os.open(path, os.O_CREAT | os.O_RDWR, 0o644)
+    try:
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            os.ftruncate(fd, 0)
+            os.write(fd, str(os.getpid()).encode())
+            yield True
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+    finally:
+        os.close(fd)
+
+def _on_term(signum, frame):
+    """SIGTERM/SIGHUP → SystemExit, so finally blocks log cron_done and release the lock."""
+    log.warning(f"cron: received signal {signum}; shutting down")
+    raise SystemExit(128 + signum)
 
 def main():
     job = sys.argv[1] if len(sys.argv) > 1 else "unknown"
+    for sig in (signal.SIGTERM, signal.SIGHUP):
+        signal.signal(sig, _on_term)
+    path = _lock_path(job)
+    with _lockfile(path) as locked:
+        if not locked:
+            log.warning(f"cron: another {job} run holds {path}; skipping")
+            return
+        _run(job)
+
+def _run(job: str):
     log.info(f"cron: cron_start {job}")
     try:
         if job == "archive":
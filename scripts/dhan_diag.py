@@ -2,24 +2,42 @@
 # Quick Dhan auth & option-chain probe. Prints clear PASS/FAIL.
 
 from __future__ import annotations
-import os, sys, json, time
+import os, sys, time
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 BASE = "https://api.dhan.co/v2"
 TIMEOUT = 8
 
+# one keep-alive session for all probes; transient 429/5xx are retried with
+# backoff (POST included: optionchain is a read), last response is returned
+_SESSION = requests.Session()
+_SESSION.mount("https://", HTTPAdapter(
+    pool_connections=4, pool_maxsize=4,
+    max_retries=Retry(total=2, backoff_factor=0.25,
+                      status_forcelist=(429, 500, 502, 503, 504),
+                      allowed_methods=frozenset({"GET", "POST"}),
+                      raise_on_status=False),
+))
+_HDR = None
+
 def _hdr():
+    global _HDR
+    if _HDR is not None:
+        return _HDR
     cid = os.environ.get("DHAN_CLIENT_ID", "").strip()
     tok = os.environ.get("DHAN_ACCESS_TOKEN", "").strip()
     if not cid or not tok:
         print("FAIL: Missing DHAN_CLIENT_ID or DHAN_ACCESS_TOKEN in env")
         sys.exit(2)
-    return {
+    _HDR = {
         "accept": "application/json",
         "content-type": "application/json",
         "client-id": cid,
         "access-token": tok,
     }
+    return _HDR
 
 def ping_profile():
     # lightweight auth check endpoint (fallback to optionchain if 401)
@@ -30,7 +48,7 @@ def ping_profile():
         "expiryCode": 0,
     }
     try:
-        r = requests.post(url, headers=_hdr(), data=json.dumps(payload), timeout=TIMEOUT)
+        r = _SESSION.post(url, headers=_hdr(), json=payload, timeout=TIMEOUT)
         ok = (200 <= r.status_code < 300)
         print(f"HTTP {r.status_code} @ /optionchain")
         if not ok:
@@ -14,7 +14,8 @@
 # -----------------------------------------------------------------------------
 
 from __future__ import annotations
-import os, json, time, logging, statistics, re
+import os, sys, json, time, logging, re
+from functools import lru_cache
 from typing import Any, Dict, List, Optional, Tuple
 
 try:
@@ -26,7 +27,17 @@ log = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
 
 # ---------------- ENV helpers ----------------
+# frozen at run() entry; per-row helpers then do a plain dict lookup
+_CFG: Optional[Dict[str, Optional[str]]] = None
+
+def _snapshot_env() -> None:
+    global _CFG
+    _CFG = {k: (v.strip() if v and v.strip() else None) for k, v in os.environ.items()}
+
 def _env(name: str, default: Optional[str] = None) -> Optional[str]:
+    if _CFG is not None:
+        v = _CFG.get(name)
+        return v if v is not None else default
     v = os.environ.get(name)
     return v.strip() if v and str(v).strip() else default
 
@@ -47,7 +58,18 @@ REQ_HEADERS_PARAMS = [
     "MV_REV_CONFIRM","lookback_days","src","notes"
 ]
 
+# client / spreadsheet / worksheet handles are built once per process
+_SH: Any = None
+_SID: Optional[str] = None
+_WS_CACHE: Dict[str, Any] = {}
+_HDR_CACHE: Dict[str, List[str]] = {}
+_CREATED: set = set()   # worksheets added by this process (known to be empty)
+_TITLES: Optional[List[str]] = None
+
 def _open_spreadsheet():
+    global _SH, _SID
+    if _SH is not None:
+        return _SH, _SID
     if gspread is None:
         raise RuntimeError("gspread not installed")
     raw = _env("GOOGLE_SA_JSON"); sid = _env("GSHEET_TRADES_SPREADSHEET_ID")
@@ -55,54 +77,64 @@ def _open_spreadsheet():
         raise RuntimeError("Sheets env missing (GOOGLE_SA_JSON / GSHEET_TRADES_SPREADSHEET_ID)")
     sa = json.loads(raw)
     gc = gspread.service_account_from_dict(sa)
-    sh = gc.open_by_key(sid)
-    return sh, sid
-
-def _open_ws_write(name: str):
+    _SH, _SID = gc.open_by_key(sid), sid
+    return _SH, _SID
+
+def _ws(name: str, create: bool = False):
+    """Cached worksheet lookup; raises if missing unless create=True."""
+    ws = _WS_CACHE.get(name)
+    if ws is not None:
+        return ws
     sh, sid = _open_spreadsheet()
     try:
-        return sh.worksheet(name)
+        ws = sh.worksheet(name)
     except Exception:
+        if not create:
+            raise
         log.info("Sheet '%s' not found in %s → creating", name, sid)
-        return sh.add_worksheet(title=name, rows=1000, cols=40)
-
-def _open_ws_read_must(name: str):
-    sh, sid = _open_spreadsheet()
-    try:
-        return sh.worksheet(name)
-    except Exception:
-        names = [w.title for w in sh.worksheets()]
-        raise RuntimeError(f"Worksheet '{name}' not found in spreadsheet {sid}. Available: {names}")
+        ws = sh.add_worksheet(title=name, rows=1000, cols=40)
+        _CREATED.add(name)
+    _WS_CACHE[name] = ws
+    return ws
 
-def _open_ws_read_optional(name: str):
-    sh, sid = _open_spreadsheet()
-    try:
-        return sh.worksheet(name)
-    except Exception:
-        return None
+def _open_ws_write(name: str):
+    return _ws(name, create=True)
 
 def _ensure_params_headers(ws) -> List[str]:
-    try:
-        hdr = ws.row_values(1)
-    except Exception:
-        hdr = []
+    hdr = _HDR_CACHE.get(ws.title)
+    if hdr is not None:
+        return hdr
+    if ws.title in _CREATED:
+        hdr = []   # just added → no header row to read
+    else:
+        try:
+            hdr = ws.row_values(1)
+        except Exception:
+            hdr = []
     if not hdr:
         ws.update("A1", [REQ_HEADERS_PARAMS])
-        return REQ_HEADERS_PARAMS
-    need = [h for h in REQ_HEADERS_PARAMS if h not in hdr]
-    if need:
-        ws.update("A1", [hdr + need])
-        return hdr + need
+        hdr = REQ_HEADERS_PARAMS
+    else:
+        need = [h for h in REQ_HEADERS_PARAMS if h not in hdr]
+        if need:
+            # only the missing header cells, appended after the existing ones
+            ws.update(gspread.utils.rowcol_to_a1(1, len(hdr) + 1), [need])
+            hdr = hdr + need
+    _HDR_CACHE[ws.title] = hdr
     return hdr
 
-def _append_params_row(row: Dict[str, Any]) -> None:
+def _append_params_rows(rows: List[Dict[str, Any]]) -> None:
+    """All symbols' rows in one append (one open + one header read per run)."""
+    if not rows:
+        return
     ws = _open_ws_write("Params_Override")
     hdr = _ensure_params_headers(ws)
-    vals = [row.get(h,"") for h in hdr]
-    ws.append_row(vals, value_input_option="RAW")
+    values = [[row.get(h,"") for h in hdr] for row in rows]
+    ws.append_rows(values, value_input_option="RAW", insert_data_option="INSERT_ROWS")
 
 # -------- tolerant numeric/string helpers --------
-_MINUSES = ["\u2212", "–", "—"]   # unicode minus/dashes
+# unicode minus/dashes → "-", thousands separators dropped, in one translate
+_NEG_TBL = str.maketrans({"\u2212": "-", "–": "-", "—": "-", ",": None})
 _NUM_RE  = re.compile(r"[-+]?\d+(?:\.\d+)?")
 _FULL_PAREN_NUM = re.compile(r"^\(\s*([-+]?\d+(?:\.\d+)?)\s*\)$")  # like (12.5)
 
@@ -112,29 +144,30 @@ def _is_formula(x: Any) -> bool:
     except Exception:
         return False
 
+# typed: 1, 1.0 and True must not share an entry (True parses to None)
+@lru_cache(maxsize=4096, typed=True)
 def _num(x) -> Optional[float]:
     """Parse numbers; ignore formulas; parentheses negative only if whole string is '(number)'."""
+    t = type(x)
+    if t is int:
+        return float(x)
+    # plain-notation floats (no exponent in repr) parse back to themselves
+    if t is float and (x == 0 or 1e-4 <= abs(x) < 1e16):
+        return x
     if x in (None, "", "—"):
         return None
     s = str(x).strip()
-    if _is_formula(s):
+    if s.startswith("="):
         return None  # skip formulas entirely
-    for uni in _MINUSES:
-        s = s.replace(uni, "-")
-    s = s.replace(",", "")
-    m_full = _FULL_PAREN_NUM.match(s)
-    if m_full:
-        try:
+    s = s.translate(_NEG_TBL)
+    if s.startswith("(") and s.endswith(")"):
+        m_full = _FULL_PAREN_NUM.match(s)
+        if m_full:
             return -float(m_full.group(1))
-        except Exception:
-            return None
     m = _NUM_RE.search(s)
     if not m:
         return None
-    try:
-        return float(m.group(0))
-    except Exception:
-        return None
+    return float(m.group(0))
 
 def _today_ist_str() -> str:
     t = time.time() + 5.5*3600
@@ -158,6 +191,8 @@ _DATE_REs = [
     re.compile(r"(\d{2})[-/](\d{2})[-/](\d{4})"),
     re.compile(r"(\d{2})[-/](\d{2})[-/](\d{2})"),
 ]
+# cells of one trading day repeat the same text, so most calls are cache hits
+@lru_cache(maxsize=4096)
 def _parse_date_str(s: str) -> Optional[str]:
     if not s: return None
     txt = s.strip()
@@ -184,9 +219,8 @@ EXIT_CANDS   = ["exit_reason","ExitReason","Exit Reason","reason","Reason"]
 
 _SUMMARY_CELL_HINT = re.compile(r"(summary|wins|losses|average|avg|total|count)", re.I)
 
-def _dupe_safe_from_ws(ws) -> List[Dict[str,Any]]:
+def _dupe_safe_from_values(vals: List[List[Any]]) -> List[Dict[str,Any]]:
     """Non-unique headers safe reader: maps row to dict, keeps raw cols too."""
-    vals = ws.get_all_values()
     if not vals or len(vals) < 2:
         return []
     header = [ (c or "").strip() for c in vals[0] ]
@@ -205,9 +239,15 @@ def _dupe_safe_from_ws(ws) -> List[Dict[str,Any]]:
     idx_pnl   = _find_idx(PNL_CANDS)
     idx_exit  = _find_idx(EXIT_CANDS)
 
+    # resolved once, not per row
+    time_like_idx = [i for i,h in enumerate(header)
+                     if h and any(k in h.lower() for k in ("time","date","timestamp","ts"))]
+    raw_keys = [sys.intern(h or f"col{i+1}") for i,h in enumerate(header)]
+    today = _today_ist_str()
+
     out: List[Dict[str,Any]] = []
     for r in rows:
-        if not any((x.strip() if isinstance(x,str) else "") for x in r):
+        if not "".join(r).strip():
             continue
         rec: Dict[str,Any] = {}
 
@@ -219,16 +259,12 @@ def _dupe_safe_from_ws(ws) -> List[Dict[str,Any]]:
 
         # date fallback: scan any time-like col
         if not rec.get("date"):
-            for i,h in enumerate(header):
-                hn = (h or "").strip()
-                if not hn: 
-                    continue
-                if any(k in hn.lower() for k in ["time","date","timestamp","ts"]):
-                    rec["date"] = _parse_date_str(str(r[i] if i < len(r) else ""))
-                    if rec["date"]:
-                        break
+            for i in time_like_idx:
+                rec["date"] = _parse_date_str(str(r[i] if i < len(r) else ""))
+                if rec["date"]:
+                    break
         if not rec.get("date"):
-            rec["date"] = _today_ist_str()
+            rec["date"] = today
 
         # symbol fallback: env
         if not rec.get("symbol"):
@@ -238,10 +274,7 @@ def _dupe_safe_from_ws(ws) -> List[Dict[str,Any]]:
             rec["exit_reason"] = r[idx_exit]
 
         # Keep all raw columns for later PNL fallback scan
-        for i,h in enumerate(header):
-            key = (h or f"col{i+1}").strip()
-            if key and i < len(r):
-                rec[key] = r[i]
+        rec.update(zip(raw_keys, r))
 
         out.append(rec)
 
@@ -249,21 +282,71 @@ def _dupe_safe_from_ws(ws) -> List[Dict[str,Any]]:
              len(out), idx_date, idx_sym, idx_pnl, idx_exit)
     return out
 
+def _sheet_titles() -> List[str]:
+    """Worksheet titles from one (cached) spreadsheet metadata fetch."""
+    global _TITLES
+    if _TITLES is None:
+        sh, _ = _open_spreadsheet()
+        _TITLES = [w.title for w in sh.worksheets()]
+    return _TITLES
+
+def _whole_sheet_a1(name: str) -> str:
+    title = name.replace("'", "''")
+    return f"'{title}'!A:ZZ"
+
+def _padded(vals: List[List[Any]]) -> List[List[Any]]:
+    # rows padded to equal width, like get_all_values()
+    width = max((len(r) for r in vals), default=0)
+    return [r + [""] * (width - len(r)) if len(r) < width else r for r in vals]
+
+def _read_values(name: str) -> List[List[Any]]:
+    """Whole sheet as formatted strings in ONE values.get."""
+    sh, _ = _open_spreadsheet()
+    return _padded(sh.values_get(_whole_sheet_a1(name)).get("values", []) or [])
+
+def _read_values_many(names: List[str]) -> List[List[List[Any]]]:
+    """Several whole sheets in ONE values.batchGet, in the order given."""
+    sh, _ = _open_spreadsheet()
+    resp = sh.values_batch_get([_whole_sheet_a1(n) for n in names])
+    return [_padded(vr.get("values", []) or []) for vr in resp.get("valueRanges", [])]
+
+def _numericise(v: Any) -> Any:
+    # same coercion gspread's get_all_records applies to each cell
+    if isinstance(v, str):
+        if "_" in v:
+            return v
+        try:
+            return int(v)
+        except ValueError:
+            try:
+                return float(v)
+            except ValueError:
+                return v
+    return v
+
+def _records_from_values(vals: List[List[Any]]) -> List[Dict[str,Any]]:
+    """get_all_records() equivalent over already-fetched values (unique headers)."""
+    keys = vals[0]
+    return [dict(zip(keys, [_numericise(v) for v in row])) for row in vals[1:]]
+
+def _perf_rows_from_values(name: str, vals: List[List[Any]], label: str) -> List[Dict[str,Any]]:
+    header = vals[0] if vals else []
+    if len(set(header)) != len(header):
+        log.warning("%s '%s' header not unique → using dupe-safe reader", label, name)
+        return _dupe_safe_from_values(vals)
+    rows = _records_from_values(vals) if vals else []
+    if rows:
+        log.info("%s='%s' rows=%d (records)", label, name, len(rows))
+        return rows
+    log.info("%s='%s' empty via records → dupe-safe", label, name)
+    return _dupe_safe_from_values(vals)
+
 def _read_performance_from_name(name: str) -> List[Dict[str,Any]]:
-    ws = _open_ws_read_must(name)
-    try:
-        rows = ws.get_all_records() or []
-        if rows:
-            log.info("Performance sheet='%s' rows=%d (records)", name, len(rows))
-            return rows
-        else:
-            log.info("Performance sheet='%s' empty via get_all_records() → trying dupe-safe", name)
-            return _dupe_safe_from_ws(ws)
-    except Exception as e:
-        if "header" in str(e).lower() and "unique" in str(e).lower():
-            log.warning("Sheet '%s' header not unique → using dupe-safe reader", name)
-            return _dupe_safe_from_ws(ws)
-        raise
+    titles = _sheet_titles()
+    if name not in titles:
+        _, sid = _open_spreadsheet()
+        raise RuntimeError(f"Worksheet '{name}' not found in spreadsheet {sid}. Available: {titles}")
+    return _perf_rows_from_values(name, _read_values(name), "Performance sheet")
 
 def _read_performance() -> List[Dict[str,Any]]:
     pref = _env("PERFORMANCE_SHEET_NAME","Performance")
@@ -272,28 +355,25 @@ def _read_performance() -> List[Dict[str,Any]]:
     except Exception as e:
         log.warning("Preferred sheet '%s' not usable (%s). Trying fallbacks...", pref, e)
 
-    for alt in [n for n in ALT_PERF_NAMES if n != pref]:
-        ws = _open_ws_read_optional(alt)
-        if ws:
+    # only names that actually exist (cached metadata) are read, all in one
+    # batchGet; first in list order wins
+    titles = _sheet_titles()
+    alts = [n for n in ALT_PERF_NAMES if n != pref and n in titles]
+    if alts:
+        try:
+            alt_vals = _read_values_many(alts)
+        except Exception as e:
+            log.warning("Fallback sheets %s read error: %s", alts, e)
+            alt_vals = []
+        for alt, vals in zip(alts, alt_vals):
             try:
-                rows = ws.get_all_records() or []
-                if rows:
-                    log.info("Performance fallback sheet='%s' rows=%d (records)", alt, len(rows))
-                    return rows
-                else:
-                    log.info("Performance fallback sheet='%s' empty via records → dupe-safe", alt)
-                    return _dupe_safe_from_ws(ws)
+                return _perf_rows_from_values(alt, vals, "Performance fallback sheet")
             except Exception as e:
-                if "header" in str(e).lower() and "unique" in str(e).lower():
-                    log.warning("Fallback sheet '%s' header not unique → using dupe-safe reader", alt)
-                    return _dupe_safe_from_ws(ws)
-                else:
-                    log.warning("Fallback sheet '%s' read error: %s", alt, e)
+                log.warning("Fallback sheet '%s' read error: %s", alt, e)
 
-    sh, sid = _open_spreadsheet()
-    names = [w.title for w in sh.worksheets()]
+    _, sid = _open_spreadsheet()
     raise RuntimeError(f"Performance sheet not found/usable. Tried: {[pref]+[n for n in ALT_PERF_NAMES if n!=pref]}. "
-                       f"Available in {sid}: {names}. Set PERFORMANCE_SHEET_NAME=... if needed.")
+                       f"Available in {sid}: {titles}. Set PERFORMANCE_SHEET_NAME=... if needed.")
 
 # ---------------- helpers for explicit column mapping & summary-skip -------------
 def _col_from_env(row: Dict[str,Any], header: List[str], env_name: str) -> Optional[Any]:
@@ -315,12 +395,12 @@ def _col_from_env(row: Dict[str,Any], header: List[str], env_name: str) -> Optio
     # also allow direct lookup if dupe-safe already stored exact key
     return row.get(key)
 
-def _is_summary_row(row: Dict[str,Any]) -> bool:
+def _is_summary_row(row: Dict[str,Any], plan: Optional[Tuple] = None) -> bool:
     if _env("PERF_SKIP_SUMMARY","1") not in {"0","no","false"}:
         # if any header key is SUMMARY-ish or any cell contains summary-ish tokens
-        for k, v in row.items():
-            if isinstance(k, str) and _SUMMARY_CELL_HINT.search(k):
-                return True
+        if (plan or _key_plan(row))[0]:
+            return True
+        for v in row.values():
             if isinstance(v, str) and _SUMMARY_CELL_HINT.search(v):
                 return True
     return False
@@ -328,48 +408,62 @@ def _is_summary_row(row: Dict[str,Any]) -> bool:
 # ---------------- PNL fallback & stats ----------------
 _PNL_KEY_HINT = re.compile(r"(pnl|p&l|profit|points?)", re.I)
 _BAD_COL_HINT = re.compile(r"(date|time|qty|quantity|ltp|price|spot|level|s1|s2|r1|r2|mp|pcr|ce|pe|oi|open|close|entry|exit|value|wins|losses|average|total|summary)", re.I)
+_PNL_EXPLICIT_KEYS = ("pnl_points","PNL","Net PnL","NetPNL","Profit","Net P&L")
+
+# rows read from one sheet share their keys, so header classification is
+# done once per distinct key layout: (summary key?, explicit, hint, scan keys)
+_KEY_PLANS: Dict[Tuple[str,...], Tuple[bool, List[str], List[str], List[str]]] = {}
+
+def _key_plan(row: Dict[str,Any]) -> Tuple[bool, List[str], List[str], List[str]]:
+    keys = tuple(row)
+    plan = _KEY_PLANS.get(keys)
+    if plan is None:
+        plan = (any(_SUMMARY_CELL_HINT.search(k) for k in keys),
+                [k for k in _PNL_EXPLICIT_KEYS if k in row],
+                [k for k in keys if _PNL_KEY_HINT.search(k)],
+                [k for k in keys if not _BAD_COL_HINT.search(k)])
+        _KEY_PLANS[keys] = plan
+    return plan
 
 def _find_pnl_in_row(row: Dict[str,Any]) -> Tuple[Optional[float], Optional[str], Optional[str]]:
     """Return (value, key, reason). Obeys PERF_PNL_COL if set; skips formulas/summary rows; zero=allowed but neutral."""
+    plan = _key_plan(row)
     # summary rows → ignore
-    if _is_summary_row(row):
+    if _is_summary_row(row, plan):
         return None, None, "summary_row"
 
     # explicit column via env
     pnl_env = _env("PERF_PNL_COL")
     if pnl_env:
-        header = [k for k in row.keys() if isinstance(k,str)]
+        header = list(row)
         raw = _col_from_env(row, header, "PERF_PNL_COL")
         if not _is_formula(raw):
             p = _num(raw)
             if p is not None:
                 return p, pnl_env, "env_col"
         # if env specified but unusable, do NOT fallback silently — still try heuristics
+    _, explicit, hints, scan = plan
     # 1) explicit keys
-    for k in ["pnl_points","PNL","Net PnL","NetPNL","Profit","Net P&L"]:
-        if k in row:
-            raw = row.get(k)
-            if _is_formula(raw): 
-                continue
-            p = _num(raw)
-            if p is not None:
-                return p, k, "explicit_key"
+    for k in explicit:
+        raw = row[k]
+        if _is_formula(raw): 
+            continue
+        p = _num(raw)
+        if p is not None:
+            return p, k, "explicit_key"
     # 2) header hints
-    for k, v in row.items():
-        if isinstance(k, str) and _PNL_KEY_HINT.search(k):
-            if _is_formula(v):
-                continue
-            p = _num(v)
-            if p is not None:
-                return p, k, "hint_key"
+    for k in hints:
+        v = row[k]
+        if _is_formula(v):
+            continue
+        p = _num(v)
+        if p is not None:
+            return p, k, "hint_key"
     # 3) last resort: any non-bad column, non-formula numeric (prefer non-zero)
     best_zero = None
     best_zero_key = None
-    for k, v in row.items():
-        if not isinstance(k, str):
-            continue
-        if _BAD_COL_HINT.search(k):
-            continue
+    for k in scan:
+        v = row[k]
         if _is_formula(v):
             continue
         p = _num(v)
@@ -383,33 +477,46 @@ def _find_pnl_in_row(row: Dict[str,Any]) -> Tuple[Optional[float], Optional[str]
         return best_zero, best_zero_key, "any_col_zero"
     return None, None, "not_found"
 
-def _stats(records: List[Dict[str,Any]]) -> Dict[str,Any]:
+def _med(xs: List[float]) -> float:
+    """Median of a plain float list (0.0 if empty); same result as statistics.median."""
+    n = len(xs)
+    if not n:
+        return 0.0
+    s = sorted(xs)
+    return s[n//2] if n & 1 else (s[n//2-1] + s[n//2]) / 2
+
+def _row_facts(r: Dict[str,Any]) -> Tuple[Optional[float], Optional[str], Optional[str], str]:
+    """(pnl, pnl source key, pick reason, upper-cased exit reason) of one Performance row."""
+    p, src, why = _find_pnl_in_row(r)
+    er = str(r.get("exit_reason") or r.get("ExitReason") or r.get("Exit Reason") or r.get("reason") or r.get("Reason") or "").strip().upper()
+    return p, src, why, er
+
+def _stats(records: List[Dict[str,Any]], facts: Optional[List[Tuple]] = None) -> Dict[str,Any]:
     debug = _env("EOD_TUNER_DEBUG","0") in {"1","true","on","yes"}
-    pnls = []; wins = []; losses = []; reasons = []
+    wins = []; losses = []
+    n = mv_rev_cnt = tp_cnt = sl_cnt = 0
     dbg_shown = 0
-    for r in records:
-        p, src, why = _find_pnl_in_row(r)
+    # single pass: counters accumulate inline instead of via a reasons list
+    for r, (p, src, why, er) in zip(records, facts or map(_row_facts, records)):
         if debug and dbg_shown < 20:
             raw = (r.get(src) if src else None)
             log.info("[DBG] PNL pick: src=%r why=%s raw=%r → parsed=%r", src, why, raw, p)
             dbg_shown += 1
         if p is None:
             continue
-        pnls.append(p)
+        n += 1
         if p > 0:   wins.append(p)      # zero = neutral
         elif p < 0: losses.append(-p)
-        er = str(r.get("exit_reason") or r.get("ExitReason") or r.get("Exit Reason") or r.get("reason") or r.get("Reason") or "").strip().upper()
-        if er: reasons.append(er)
+        if er:
+            if "MV" in er: mv_rev_cnt += 1
+            if "TP" in er: tp_cnt += 1
+            if er == "SL": sl_cnt += 1
 
-    n = len(pnls)
     wr = (len(wins)/n*100.0) if n>0 else 0.0
     avg_win = (sum(wins)/len(wins)) if wins else 0.0
     avg_loss = (sum(losses)/len(losses)) if losses else 0.0
-    med_win = statistics.median(wins) if wins else 0.0
-    med_loss = statistics.median(losses) if losses else 0.0
-    mv_rev_cnt = sum(1 for x in reasons if "MV" in x)
-    tp_cnt = sum(1 for x in reasons if "TP" in x)
-    sl_cnt = sum(1 for x in reasons if x=="SL")
+    med_win = _med(wins)
+    med_loss = _med(losses)
     return dict(n=n, wr=wr, avg_win=avg_win, avg_loss=avg_loss,
                 med_win=med_win, med_loss=med_loss,
                 mv_rev_cnt=mv_rev_cnt, tp_cnt=tp_cnt, sl_cnt=sl_cnt)
@@ -421,7 +528,20 @@ def _base(sym: str, key: str, fallback: float) -> float:
         return float(BASE[s][key])
     return float(fallback)
 
-def _tune_for_symbol(sym: str, perf: List[Dict[str,Any]], lookback_days: int, min_trades: int) -> Optional[Dict[str,Any]]:
+PerfCols = Tuple[Dict[str, List[int]], List[str], List[Optional[Tuple]]]
+
+def _perf_columns(records: List[Dict[str,Any]]) -> PerfCols:
+    """Row indices per upper-cased symbol, the date column, and an empty per-row
+    _row_facts memo (blank-symbol rows are shared by every symbol), built once per run."""
+    by_sym: Dict[str, List[int]] = {}
+    dates: List[str] = []
+    for i, r in enumerate(records):
+        by_sym.setdefault(str(r.get("symbol") or r.get("Symbol") or "").upper(), []).append(i)
+        dates.append(str(r.get("date") or r.get("Date") or "").strip())
+    return by_sym, dates, [None] * len(records)
+
+def _tune_for_symbol(sym: str, perf: List[Dict[str,Any]], lookback_days: int, min_trades: int,
+                     cols: Optional[PerfCols] = None) -> Optional[Dict[str,Any]]:
     BUF = _sym_env(sym, "LEVEL_BUFFER", _base(sym, "BUF", 12.0))
     BAND= _sym_env(sym, "ENTRY_BAND", _base(sym, "BAND", 3.0))
     TGT = _sym_env(sym, "TARGET_MIN_POINTS", _base(sym, "TGT", 30.0))
@@ -432,41 +552,32 @@ def _tune_for_symbol(sym: str, perf: List[Dict[str,Any]], lookback_days: int, mi
     MVN = float(_env("MV_REV_CONFIRM","2") or "2")
 
     # Dates filter (simple; if no dates, uses ALL)
-    def _last_n_dates(records: List[Dict[str,Any]], n: int, sym: str) -> List[str]:
-        seen = []
-        S = sym.upper()
-        for r in records:
-            rs = str(r.get("symbol") or r.get("Symbol") or "").upper()
-            if rs and rs != S: continue
-            d = str(r.get("date") or r.get("Date") or "").strip()
-            if not d: continue
-            if d not in seen: seen.append(d)
-        return (seen[-n:] if len(seen) >= n else seen) or ["ALL"]
-
-    def _filter_by(records: List[Dict[str,Any]], sym: str, dates: List[str]) -> List[Dict[str,Any]]:
-        if dates == ["ALL"]:
-            out = []
-            S = sym.upper()
-            for r in records:
-                rs = str(r.get("symbol") or r.get("Symbol") or "").upper()
-                if rs and rs != S: continue
-                out.append(r)
-            return out
-        out = []
-        D = set(dates); S = sym.upper()
-        for r in records:
-            rs = str(r.get("symbol") or r.get("Symbol") or "").upper()
-            if rs and rs != S: continue
-            d = str(r.get("date") or r.get("Date") or "").strip()
-            if d in D: out.append(r)
-        return out
-
-    dates = _last_n_dates(perf, int(float(_env("EOD_LOOKBACK_DAYS","10"))), sym)
-    rows = _filter_by(perf, sym, dates)
-    st = _stats(rows)
-    if st["n"] < int(float(_env("EOD_MIN_TRADES","8"))):
+    by_sym, dates_col, memo = cols or _perf_columns(perf)
+    S = sym.upper()
+    # rows without a symbol count for every symbol; keep sheet order
+    mine = sorted(by_sym.get(S, []) + by_sym.get("", []))
+
+    def _last_n_dates(n: int) -> List[str]:
+        seen_l = list(dict.fromkeys(d for d in map(dates_col.__getitem__, mine) if d))
+        # chronological when every value parses; otherwise sheet order as before
+        keyed = [_parse_date_str(d) for d in seen_l]
+        if all(keyed):
+            seen_l = [d for _, d in sorted(zip(keyed, seen_l), key=lambda t: t[0])]
+        return (seen_l[-n:] if len(seen_l) >= n else seen_l) or ["ALL"]
+
+    dates = _last_n_dates(lookback_days)
+    if dates == ["ALL"]:
+        idx = mine
+    else:
+        D = set(dates)
+        idx = [i for i in mine if dates_col[i] in D]
+    for i in idx:
+        if memo[i] is None:
+            memo[i] = _row_facts(perf[i])
+    st = _stats([perf[i] for i in idx], [memo[i] for i in idx])
+    if st["n"] < min_trades:
         log.info("[%s] Not enough trades in lookback (have %d, need %d) → skip tuning.",
-                 sym, st["n"], int(float(_env("EOD_MIN_TRADES","8"))))
+                 sym, st["n"], min_trades)
         return None
 
     wr, avg_win, avg_loss = st["wr"], st["avg_win"], st["avg_loss"]
@@ -508,11 +619,12 @@ def _tune_for_symbol(sym: str, perf: List[Dict[str,Any]], lookback_days: int, mi
                 TP_POINTS=TP, SL_POINTS=SL,
                 TRAIL_TRIGGER_POINTS=TR, TRAIL_OFFSET_POINTS=TOF,
                 MV_REV_CONFIRM=MVN,
-                lookback_days=int(float(_env("EOD_LOOKBACK_DAYS","10"))),
+                lookback_days=lookback_days,
                 notes=summary + " | " + "; ".join(notes))
 
 # ---------------- main ----------------
 def run():
+    _snapshot_env()
     symbols_csv = _env("EOD_TUNE_SYMBOLS") or _env("OC_SYMBOL","NIFTY")
     symbols = [s.strip().upper() for s in symbols_csv.split(",") if s.strip()]
     dry = (_env("EOD_TUNER_DRY_RUN","0") in {"1","true","on","yes"})
@@ -522,10 +634,12 @@ def run():
         raise RuntimeError("Performance sheet is present but has no rows. Run backtest or live first.")
 
     today = _today_ist_str()
-    wrote = 0
+    cols = _perf_columns(perf)
+    lookback = int(float(_env("EOD_LOOKBACK_DAYS","10")))
+    min_tr = int(float(_env("EOD_MIN_TRADES","8")))
+    pending: List[Dict[str, Any]] = []
     for sym in symbols:
-        rec = _tune_for_symbol(sym, perf, int(float(_env("EOD_LOOKBACK_DAYS","10"))),
-                               int(float(_env("EOD_MIN_TRADES","8"))))
+        rec = _tune_for_symbol(sym, perf, lookback, min_tr, cols)
         if not rec:
             log.info("[%s] Skipped (insufficient data).", sym)
             continue
@@ -537,10 +651,12 @@ def run():
                "lookback_days": rec["lookback_days"], "src": "tuner-v1", "notes": rec["notes"]}
         log.info("[%s] EOD params: %s", sym, json.dumps(row, ensure_ascii=False))
         if not dry:
-            _append_params_row(row); wrote += 1
+            pending.append(row)
         else:
             log.info("[DRY_RUN] Not writing to Params_Override")
 
+    _append_params_rows(pending)
+    wrote = len(pending)
     log.info("EOD Tuner done. rows_written=%d dry_run=%s", wrote, str(dry))
 
 if __name__ == "__main__":